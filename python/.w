@@ -0,0 +1 @@
+-compress
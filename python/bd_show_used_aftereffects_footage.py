@@ -26,6 +26,10 @@ import os
 import re
 import sys
 import finder_colors
+from multiprocessing.pool import ThreadPool
+
+# A quoted file name marks a sequence, otherwise the path is a single file
+footageRegEx = re.compile(r'(?P<name>"[^"]*")|(?P<path>/[/a-zA-Z0-9\-_.#]*)')
 
 
 # Child Functions
@@ -72,38 +76,75 @@ def list_duplicates(seq):
     return list(seen_twice)
 
 
-def removeNonAscii(s): return "".join(i for i in s if ord(i) < 126 and ord(i) > 31)
+def unique_list(seq):
+    seen = set()
+    seen_add = seen.add
+    # keeps the first occurrence of every element, in order
+    return [x for x in seq if not (x in seen or seen_add(x))]
 
 
-def collectreads(script, batch=False):
+# Everything outside the printable range removeNonAscii keeps (32-125)
+nonAsciiChars = "".join(chr(i) for i in range(256) if not 31 < i < 126)
+nonAsciiRegEx = re.compile(r'[^\x20-\x7d]')
 
-    readFootage = False
 
-    sequences = []
-    singleFiles = []
+def removeNonAscii(s):
+    if isinstance(s, str):
+        return s.translate(None, nonAsciiChars)
+    return nonAsciiRegEx.sub(u'', s)
 
-    inputFile = open(script, mode='rU')
-    wholePathRegEx = re.compile('/[/a-zA-Z0-9\-\_\.#]*')
-    fileNameRegEx = re.compile('".*"')
 
-    for line in inputFile:
+def color_footage(path):
+    if os.path.exists(path):
+        finder_colors.set(path, "purple")
 
-        if "Number of missing items:" in line:
-                readFootage = False
 
-        if readFootage:
-            path = wholePathRegEx.search(line)
-            name = fileNameRegEx.search(line)
-            if name:
-                sequences.append(path.group())
-            elif path:
-                singleFiles.append(path.group())
+def collectreads(script, batch=False):
 
-        if "Collected source files" in line:
-            readFootage = True
+    sequences = []
+    singleFiles = []
 
+    inputFile = open(script, mode='rU')
+    report = inputFile.read()
     inputFile.close()
 
+    # Only the lines between these two markers list footage
+    start = report.find("Collected source files")
+    if start == -1:
+        start = end = 0
+    else:
+        start = report.find("\n", start) + 1 or len(report)
+        end = report.find("Number of missing items:", start)
+        if end == -1:
+            end = len(report)
+        else:
+            end = max(start, report.rfind("\n", start, end) + 1)
+
+    # Bind the hot lookups once instead of on every line
+    footage_finditer = footageRegEx.finditer
+    sequences_append = sequences.append
+    singleFiles_append = singleFiles.append
+
+    for line in report[start:end].splitlines():
+        path = None
+        name = False
+        for match in footage_finditer(line):
+            if match.lastgroup == 'name':
+                name = True
+            elif path is None:
+                path = match.group()
+            if name and path is not None:
+                break
+        if path is not None:
+            if name:
+                sequences_append(path)
+            else:
+                singleFiles_append(path)
+
+    # A sequence folder is listed once per frame, every path only needs listing and coloring once
+    sequences = unique_list(sequences)
+    singleFiles = unique_list(singleFiles)
+
     print("\n\n" + "#" * 37 + "\n" + "#" * 37 + "\n\n")
 
     if batch:
@@ -111,12 +152,15 @@ def collectreads(script, batch=False):
     else:
         query = query_yes_no("Do you want to mark the used folders or files in Finder (only works on OS X)?", "no")
     if query:
-        for unique_dir in sequences:
-            if os.path.exists(unique_dir):
-                finder_colors.set(unique_dir, "purple")
-        for unique_file in singleFiles:
-            if os.path.exists(unique_file):
-                finder_colors.set(unique_file, "purple")
+        # Overlap the xattr writes in threads
+        unique = set(sequences)
+        unique.update(singleFiles)
+        pool = ThreadPool(16)
+        try:
+            pool.map(color_footage, unique)
+        finally:
+            pool.close()
+            pool.join()
 
     print("\n\n" + "#" * 37 + "\n" + "#" * 37 + "\n\n")
     print("This are all the file sequences:\n\n")
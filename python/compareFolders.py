@@ -8,71 +8,67 @@ Copyright (c) 2013 BabylonDreams. All rights reserved.
 """
 
 import os, sys
+from itertools import imap
+from parallel_walk import parallel_walk
+
+
+def scan_directory(path, extensions):
+    """Returns the set of file names below path, only the names are compared."""
+    names = set()
+    for root, dirs, files in parallel_walk(path):
+        # Interned names make the comparison of both sets a pointer check
+        # for every name that exists on both sides
+        if extensions:
+            names.update([intern(name) for name in files
+                          if name.lower().endswith(extensions)])
+        else:
+            names.update(imap(intern, files))
+    return names
 
 
 def main():
     copyrecord = os.path.expanduser("~/folder-differences.txt")
 
-    filterstring = raw_input('Filter for this file type (please type the file '
-                             'extension, e.g. ".mov" or leave empty to work on all '
-                             'files): ')
+    filterstring = raw_input('Filter for these file types (please type the file '
+                             'extensions, e.g. ".mov" or ".mov, .mp4, .mxf" or leave '
+                             'empty to work on all files): ')
+    # One pass over the trees handles all extensions, case doesn't matter
+    extensions = tuple(extension.strip().lower() for extension in filterstring.split(",")
+                       if extension.strip())
 
     inputleft = raw_input("Enter your first path (the one copied from): ")
     if not os.path.isdir(inputleft):
         return "Error, not a valid path"
-    countleft = 0
-    pathleft = []
-    nameleft = []
 
     inputright = raw_input("Enter your second path (the one copied to): ")
     if not os.path.isdir(inputright):
         return "Error, not a valid path"
-    countright = 0
-    pathright = []
-    nameright = []
 
     print "\n\nPlease be patient. This might take a while. (About 1.5 minutes for " \
           "1TB of data over ethernet.)\n"
 
     print("Caching first path's items…")
-    for root, dirs, files in os.walk(inputleft):
-        for name in files:
-            if filterstring in name:
-                nameleft.append(name)
-                pathleft.append(os.path.join(root, name))
-                countleft += 1
+    nameleft = scan_directory(inputleft, extensions)
 
-    print(str(countleft) + " items found.\n")
+    print(str(len(nameleft)) + " items found.\n")
 
     print("Caching second path's items…")
-    for root, dirs, files in os.walk(inputright):
-        for name in files:
-            if filterstring in name:
-                nameright.append(name)
-                pathright.append(os.path.join(root, name))
-                countright += 1
+    nameright = scan_directory(inputright, extensions)
 
-    print(str(countright) + " items found.\n")
+    print(str(len(nameright)) + " items found.\n")
 
-    differences = None
-    differences = sorted(list(set(nameleft).symmetric_difference(set(nameright))))
+    differences = sorted(nameleft.symmetric_difference(nameright))
 
-    if differences is None:
+    if not differences:
         print "There has been no mismatch!"
     else:
-        print("These files differ:")
-
-        for differ in differences:
-            print differ
-
-            if os.path.exists(copyrecord):
-                file = open(copyrecord, 'a')
-                file.write(differ + "\n")
-                file.close()
-            else:
-                file = open(copyrecord, 'w')
-                file.write(differ + "\n")
-                file.close()
+        # Hand the whole list over in one write instead of one call per name
+        report = "\n".join(differences) + "\n"
+        sys.stdout.write("These files differ:\n" + report)
+
+        file = open(copyrecord, 'a')
+        file.write(report)
+        file.close()
 
 
 if __name__ == "__main__":
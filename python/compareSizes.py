@@ -8,14 +8,141 @@ Copyright (c) 2013 BabylonDreams. All rights reserved.
 """
 
 import os, sys
+from functools import partial
+from itertools import izip
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 from query_yes_no import query_yes_no
-from hash_for_file import hash_for_file
+from hash_for_file import new_hash, hash_name
+from files_equal import files_equal
+from parallel_walk import parallel_walk
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+# Checksums of earlier runs, as path -> (file key, digest), see file_key.
+# A file whose key is unchanged isn't read again.
+HASH_CACHE = os.path.expanduser("~/.cache/compareSizes.pickle")
+
+
+def scan_directory_for_comparison(path, extensions):
+    """Returns a dict of file name -> path. A name found more than once keeps
+    its alphabetically first path, as folders are listed in no fixed order."""
+    paths = {}
+    for root, dirs, files in parallel_walk(path):
+        # Only test names against the filter when there is one
+        if extensions:
+            files = [name for name in files if name.lower().endswith(extensions)]
+        # Joined once per folder, os.path.join per file is comparatively slow
+        prefix = os.path.join(root, "")
+        for name in files:
+            # Interned, so names shared by both trees compare by identity
+            name = intern(name)
+            filepath = prefix + name
+            if name not in paths or filepath < paths[name]:
+                paths[name] = filepath
+    return paths
+
+
+COPY_SCRIPT_HEADER = """#!/usr/bin/env python
+# encoding: utf-8
+from copyFile import copyFile
+
+"""
+# repr() keeps paths with quotes or backslashes valid Python
+COPY_SCRIPT_LINE = "copyFile({!r}, {!r})\n"
+
+
+def load_hash_cache():
+    try:
+        with open(HASH_CACHE, 'rb') as cachefile:
+            return pickle.load(cachefile)
+    except (EnvironmentError, EOFError, pickle.UnpicklingError):
+        return {}
+
+
+def save_hash_cache(cache):
+    # Forget files that are gone, the cache would only ever grow otherwise
+    for path in [path for path in cache if not os.path.exists(path)]:
+        del cache[path]
+    cachedir = os.path.dirname(HASH_CACHE)
+    if not os.path.isdir(cachedir):
+        os.makedirs(cachedir)
+    # Written next to the old one and renamed, so an interrupted run can't
+    # leave a broken cache behind
+    with open(HASH_CACHE + ".tmp", 'wb') as cachefile:
+        pickle.dump(cache, cachefile, pickle.HIGHEST_PROTOCOL)
+    os.rename(HASH_CACHE + ".tmp", HASH_CACHE)
+
+
+def file_key(filestat):
+    # mtime alone can't be trusted: copyFile (copystat) and utime set it back
+    # to an older value. ctime and the inode can't be set that way, and
+    # digests of another hash backend can't be compared at all.
+    return (filestat.st_mtime, filestat.st_size, filestat.st_ctime, filestat.st_ino,
+            hash_name)
+
+
+def cached_digest(path, filestat, cache):
+    """Returns the stored digest of path, or None if there is none for the
+    file as it is now."""
+    # Absolute, so runs started from other folders share the entries
+    cached = cache.get(os.path.abspath(path))
+    if cached is not None and cached[0] == file_key(filestat):
+        return cached[1]
+
+
+def store_digest(path, filestat, digest, cache):
+    cache[os.path.abspath(path)] = (file_key(filestat), digest)
+
+
+def size_mismatch(leftstat, rightstat):
+    if leftstat.st_size != rightstat.st_size:
+        return "a size mismatch (%d vs %d bytes)" % (leftstat.st_size, rightstat.st_size)
+
+
+def size_difference(paths):
+    """Returns why the two files differ in size, or None if they don't."""
+    leftpath, rightpath = paths
+    return size_mismatch(os.stat(leftpath), os.stat(rightpath))
+
+
+def content_difference(cache, paths):
+    """Like size_difference, but files of the same size get their contents
+    compared, by their stored checksums where both files are unchanged."""
+    leftpath, rightpath = paths
+    leftstat = os.stat(leftpath)
+    rightstat = os.stat(rightpath)
+    # Differing sizes already answer it, no need to read either file
+    reason = size_mismatch(leftstat, rightstat)
+    if reason is not None:
+        return reason
+    leftdigest = cached_digest(leftpath, leftstat, cache)
+    rightdigest = cached_digest(rightpath, rightstat, cache)
+    if leftdigest is not None and rightdigest is not None:
+        equal = leftdigest == rightdigest
+    else:
+        # Read side by side, stopping at the first differing block. Only
+        # equal files are read to the end, so only then are the digests
+        # complete and worth keeping.
+        hashes = (new_hash(), new_hash())
+        equal = files_equal(leftpath, rightpath, hashes=hashes)
+        if equal:
+            store_digest(leftpath, leftstat, hashes[0].digest(), cache)
+            store_digest(rightpath, rightstat, hashes[1].digest(), cache)
+    if not equal:
+        return "a content mismatch"
 
 
 def main():
-    filterstring = raw_input('Filter for this file type (please type the file '
-                             'extension, e.g. ".mov" or leave empty to work on all '
-                             'files): ')
+    filterstring = raw_input('Filter for these file types (please type the file '
+                             'extensions, e.g. ".mov" or ".mov, .mp4, .mxf" or leave '
+                             'empty to work on all files): ')
+    # One pass over the trees handles all extensions, case doesn't matter
+    extensions = tuple(extension.strip().lower() for extension in filterstring.split(",")
+                       if extension.strip())
     hashing = query_yes_no(
         "Do you want to use the much more time intensive, but accurate checksum "
         "approach? (WARNING: Not feasible for anything beyond a couple of GB!!)",
@@ -24,16 +151,10 @@ def main():
     inputleft = raw_input("Enter your first path (the one copied from): ")
     if not os.path.isdir(inputleft):
         return "Error, not a valid path"
-    countleft = 0
-    pathleft = []
-    nameleft = []
 
     inputright = raw_input("Enter your second path (the one copied to): ")
     if not os.path.isdir(inputright):
         return "Error, not a valid path"
-    countright = 0
-    pathright = []
-    nameright = []
 
     if not hashing:
         print "\n\nPlease be patient. This might take a while. (About 1.5 minutes for " \
@@ -43,69 +164,66 @@ def main():
                 1TB of data over ethernet.)"
 
     print "\nCaching first path's items…"
-    for root, dirs, files in os.walk(inputleft):
-        for name in files:
-            if filterstring in name:
-                nameleft.append(name)
-                pathleft.append(os.path.join(root, name))
-                countleft += 1
+    pathleft = scan_directory_for_comparison(inputleft, extensions)
 
     print "Caching second path's items…\n"
-    for root, dirs, files in os.walk(inputright):
-        for name in files:
-            if filterstring in name:
-                nameright.append(name)
-                pathright.append(os.path.join(root, name))
-                countright += 1
+    pathright = scan_directory_for_comparison(inputright, extensions)
+
+    leftset = set(pathleft)
+    matches = list(leftset.intersection(pathright))
+    pairs = [(pathleft[match], pathright[match]) for match in matches]
 
-    leftset = set(nameleft)
-    matches = leftset.intersection(nameright)
+    # Comparing is mostly waiting on reads or stat() calls (slow on network
+    # shares), which release the GIL, so several pairs are compared at once
+    # while the results are taken in order
+    pool = ThreadPool(cpu_count() * 2)
+    if hashing:
+        hashcache = load_hash_cache()
+        comparisons = pool.imap(partial(content_difference, hashcache), pairs)
+    else:
+        comparisons = pool.imap(size_difference, pairs, 256)
 
     copyagain = None
-    copyrecord = ""
-    exists = 0
-    mismatch = 0
+    copyrecord = inputright + "/copyagain.py"
+    copylist = []
+    mismatches = []
     i = 1
 
-    for match in matches:
-        leftindex = nameleft.index(match)
-        rightindex = nameright.index(match)
+    try:
+        for match, (leftpath, rightpath) in izip(matches, pairs):
+            if hashing:
+                print "Comparing file " + str(i) + " of " + str(len(matches))
+                i += 1
+            reason = next(comparisons)
+            if reason:
+                mismatches.append("\n\n" + match + " has " + reason + "\n\n")
+                if (copyagain == None):
+                    copyagain = query_yes_no(
+                        "\n\nThere have been mismatches in size. Do you want to mark the "
+                        "specified files for later processing?")
+                if (copyagain == True):
+                    copylist.append(COPY_SCRIPT_LINE.format(leftpath, rightpath))
+    except:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+        # Keep the digests computed so far, even when stopped with ctrl-c
         if hashing:
-            print "Comparing file " + str(i) + " of " + str(len(matches))
-            i += 1
-            sizeleft = hash_for_file(pathleft[leftindex])
-            sizeright = hash_for_file(pathright[rightindex])
-        else:
-            sizeleft = os.stat(pathleft[leftindex]).st_size
-            sizeright = os.stat(pathright[rightindex]).st_size
-        if (sizeleft != sizeright):
-            mismatch = 1
-            if (copyagain == None):
-                copyagain = query_yes_no(
-                    "\n\nThere have been mismatches in size. Do you want to mark the "
-                    "specified files for later processing?")
-            if (copyagain == True):
-                copyrecord = inputright + "/copyagain.py"
-                if exists:
-                    file = open(copyrecord, 'a')
-                    file.write("copyFile(\"" + pathleft[leftindex] + "\", "
-                               "\""  + pathright[rightindex] + "\")\n")
-                    file.close()
-                else:
-                    file = open(copyrecord, 'w')
-                    file.write(
-                        "#!/usr/bin/env python\n# encoding: utf-8\nfrom copyFile "
-                        "import copyFile\n\ncopyFile(\"" +
-                        pathleft[leftindex] + "\", \"" + pathright[rightindex] + "\")\n")
-                    file.close()
-                    exists = 1
-            print "\n\n" + match + " has a size mismatch\n"
-    if exists and os.path.exists(copyrecord):
+            save_hash_cache(hashcache)
+    # Report all mismatches in one write
+    sys.stdout.write("".join(mismatches))
+    if copylist:
+        # The whole script is written at once from the template
+        with open(copyrecord, 'w') as copyfile:
+            copyfile.write(COPY_SCRIPT_HEADER + "".join(copylist))
         os.chmod(copyrecord, 0755)
         print "\n\nA file with all data to be copied has been written to your " \
               "destination directory.\n\n" + copyrecord + "\n\nRefine it as you see " \
               "fit or simply run it to get a new copy of the mismatched files.\n"
-    if not mismatch:
+    if not mismatches:
         print "There has been no size mismatch!"
 
 
@@ -35,83 +35,111 @@ import subprocess
 import os
 import traceback
 import argparse
+import signal
+from functools import partial
+from multiprocessing import Pool, cpu_count
+from multiprocessing.pool import ThreadPool
 
 from timer import timer
 
+# The external tools' progress output and warnings are of no use here
+DEVNULL = open(os.devnull, "wb")
+
 
 def extract_layers(input_file):
-    # imagemagick command to print out layer information about the input PSD
-    identify_cmd = "identify -verbose '{}' | grep 'label:' | cut -d: -f 2".format(input_file)
+    # imagemagick command to print only the label of every image in the input PSD,
+    # one per line, starting with the (unlabeled) flattened composite at index 0
+    identify_cmd = ["identify", "-format", "%[label]\n", input_file]
 
     # check_output runs the specified command, and writes the result string to the var
-    layers = subprocess.check_output(identify_cmd, shell=True)
+    try:
+        layers = subprocess.check_output(identify_cmd, stderr=DEVNULL)
+    except subprocess.CalledProcessError as e:
+        print("Skipping {}, identify couldn't read it (exit status {}).".format(input_file, e.returncode))
+        return None
 
-    return layers
+    return layers.rstrip("\n")
 
 
-def export_layer(psdIndex, layer_name, inputFile, compression):
-    extractedFilename = "{basename}_{layer}_tmp.exr".format(
-        basename=os.path.splitext(inputFile)[0],
-        layer=layer_name
-    )
+def export_layer(psdIndex, layer_name, inputFile, basename):
+    extractedFilename = get_tmpFilename(basename, layer_name)
 
-    cmd = "convert '{input}[{index}]' -compress {compress} -colorspace RGB '{output}'".format(
-        input=inputFile,
-        index=psdIndex,
-        output=extractedFilename,
-        compress=compression
-    )
+    # The temporary file is only read back once by exrmaketiled, which applies the
+    # requested compression itself, so don't spend time compressing it here
+    cmd = ["convert", "{input}[{index}]".format(input=inputFile, index=psdIndex),
+           "-compress", "None", "-colorspace", "RGB", extractedFilename]
 
     # print cmd
-    subprocess.call(cmd, shell=True)
+    subprocess.check_call(cmd, stdout=DEVNULL, stderr=DEVNULL)
     return extractedFilename
 
 
-def exr_compression(input, compression):
-    filesplit = os.path.splitext(input)
-    cmd = "exrmaketiled -o -z {} '{}' '{}'".format(compression, input, "{}{}".format(filesplit[0][:-4], filesplit[1]))
+def exr_compression(input, output, compression):
+    cmd = ["exrmaketiled", "-o", "-z", compression, input, output]
     # print cmd
-    subprocess.call(cmd, shell=True)
+    subprocess.check_call(cmd, stdout=DEVNULL, stderr=DEVNULL)
 
 
-def exr_multipart(layers, input):
-    cmd = "exrmultipart -combine -i"
+def exr_multipart(layers, basename):
+    cmd = ["exrmultipart", "-combine", "-i"]
 
-    multiFilename = "{basename}.exr".format(basename=os.path.splitext(input)[0])
+    multiFilename = "{basename}.exr".format(basename=basename)
 
     if os.path.exists(multiFilename):
-        multiFilename = "{basename}_multi.exr".format(basename=os.path.splitext(input)[0])
+        multiFilename = "{basename}_multi.exr".format(basename=basename)
 
     # Make sure rgba is the topmost layer of the EXR
+    rgbaParts = []
+    otherParts = []
+    layerFilenames = []
     for layer in layers:
-        if layer.strip() == "rgba":
-            cmd = "{} '{}'::'{}'".format(cmd, get_layerFilename(input, layer), layer.strip())
-
-    for layer in layers:
+        layer = layer.strip()
         if layer == "":
             print("Skipping empty layer name. Likely flattened compatibility layer.")
-        elif layer.strip() == "rgba":
-            pass
+            continue
+
+        layerFilename = get_layerFilename(basename, layer)
+        if not os.path.exists(layerFilename):
+            print("Leaving out layer {}, it failed to convert.".format(layer))
+            continue
+        layerFilenames.append(layerFilename)
+        part = "{}::{}".format(layerFilename, layer)
+        if layer == "rgba":
+            rgbaParts.append(part)
         else:
-            cmd = "{} '{}'::'{}'".format(cmd, get_layerFilename(input, layer), layer)
+            otherParts.append(part)
 
-    cmd = "{} -o '{}'".format(cmd, multiFilename)
-    print cmd
-    subprocess.call(cmd, shell=True)
+    cmd += rgbaParts + otherParts + ["-o", multiFilename]
+    print " ".join(cmd)
+    try:
+        subprocess.check_call(cmd, stdout=DEVNULL, stderr=DEVNULL)
+    except subprocess.CalledProcessError as e:
+        # Keep the single layer files, they are all there is now
+        print("Failed to combine the layers into {}: exrmultipart exited with status {}".format(
+            multiFilename, e.returncode))
+        return
 
-    for layer in layers:
-        cleanup(get_layerFilename(input, layer))
+    for layerFilename in layerFilenames:
+        cleanup(layerFilename)
 
 
-def get_layerFilename(input, layer):
+def get_layerFilename(basename, layer):
     layer = layer.strip()
     layerFilename = "{basename}_{layer}.exr".format(
-        basename=os.path.splitext(input)[0],
+        basename=basename,
         layer=layer
     )
     return layerFilename
 
 
+def get_tmpFilename(basename, layer):
+    tmpFilename = "{basename}_{layer}_tmp.exr".format(
+        basename=basename,
+        layer=layer
+    )
+    return tmpFilename
+
+
 def cleanup(input):
     if os.path.exists(input):
         try:
@@ -121,17 +149,73 @@ def cleanup(input):
             print traceback.format_exc()
 
 
+def convert_layer(job):
+    i, layer, input_file, basename, compression = job
+    print("layer {}: {}".format(i, layer))
+    try:
+        tmpfile = export_layer(i, layer, input_file, basename)
+        exr_compression(tmpfile, get_layerFilename(basename, layer), compression)
+    except subprocess.CalledProcessError as e:
+        print("Failed to convert layer {} of {}: {} exited with status {}".format(
+            layer, input_file, e.cmd[0], e.returncode))
+    finally:
+        cleanup(get_tmpFilename(basename, layer))
+
+
+def process_file(input_file, multi, compression, layer_workers=1):
+    # Runs in a worker process, an exception raised here may not survive the trip back
+    # to the main process and would leave it waiting forever, so report it right here
+    try:
+        convert_file(input_file, multi, compression, layer_workers)
+    except Exception:
+        print("Failed to convert {}".format(input_file))
+        print traceback.format_exc()
+
+
+def convert_file(input_file, multi, compression, layer_workers=1):
+    layers = extract_layers(input_file)
+    if layers is None:
+        return
+    basename = os.path.splitext(input_file)[0]
+
+    # Layers with the same name write the same files, so only the last of them is
+    # converted. That is the one which ended up in the output when done one by one.
+    jobs = {}
+    for i, layer in enumerate(layers.split("\n")):
+        layer = layer.strip()
+        if layer == "":
+            print("Skipping empty layer name. Likely flattened compatibility layer.")
+        else:
+            jobs[layer] = (i, layer, input_file, basename, compression)
+
+    # Layers are converted by independent external processes, threads are enough to overlap them
+    pool = ThreadPool(layer_workers)
+    try:
+        pool.map(convert_layer, jobs.values())
+    finally:
+        pool.close()
+        pool.join()
+
+    if multi:
+        exr_multipart(layers.split("\n"), basename)
+
+
+def ignore_sigint():
+    # Ctrl-C is handled by the main process alone, which stops the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
 def main(input, multi, compression):
     if os.path.isfile(input) or os.path.isdir(input):
 
         start = timer()
 
         if os.path.isdir(input):
-            list = os.listdir(input)
             files = []
 
-            for l in list:
-                if os.path.splitext(l)[1] == ".psd":
+            # Filter on the name first so only PSDs need a stat call
+            for l in os.listdir(input):
+                if l.lower().endswith(".psd"):
                     l = os.path.join(input, l)
                     if os.path.isfile(l):
                         files.append(l)
@@ -140,28 +224,24 @@ def main(input, multi, compression):
 
         print("Found {} files to convert.".format(len(files)))
 
-        for f in files:
-
-            layers = extract_layers(f)
-
-            i = 0
-            for layer in layers.split("\n"):
-                i += 1
-                layer = layer.strip()
-                if layer == "":
-                    print("Skipping empty layer name. Likely flattened compatibility layer.")
-                else:
-                    print("layer {}: {}".format(i, layer))
-                    tmpfile = export_layer(i, layer, f, compression)
-                    exr_compression(tmpfile, compression)
-                    cleanup(tmpfile)
-
-            if multi:
-                exr_multipart(layers.split("\n"), f)
-
-
-            else:
-                print("Not a PSD document. Skipping.")
+        # Convert several files at once and split the remaining cores between their layers
+        workers = max(1, min(len(files), cpu_count()))
+        layer_workers = max(1, cpu_count() // workers)
+        pool = Pool(workers, ignore_sigint)
+        try:
+            result = pool.map_async(partial(process_file, multi=multi, compression=compression,
+                                            layer_workers=layer_workers),
+                                    files)
+            # A blocking wait without timeout can't be interrupted with ctrl-c
+            while not result.ready():
+                result.wait(3600)
+            result.get()
+        except KeyboardInterrupt:
+            pool.terminate()
+            pool.join()
+            raise
+        pool.close()
+        pool.join()
 
         timer(start, "PSD To EXR Conversion")
 
@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+# encoding: utf-8
 
 # Python script to fix broken symlinks
 # Monday, Sep 26, 2011 4:47 pm
@@ -14,29 +15,64 @@
 # This script will only fix symlinks that point to files/directories within the BASEDIR.
 
  
-import os
+import os, sys
+
+try:
+    # scandir's entries know whether they are links from the directory
+    # listing itself (https://github.com/benhoyt/scandir)
+    from scandir import scandir
+except ImportError:
+    scandir = None
  
 # Configuration
  
 BASEDIR = '/Volumes/ProjectsRaid/WorkingProjects'
 OLDBASE = '/Volumes/Happy-SwapRAID/WorkingProjects'
 DEBUG = True # I recommend a test run first
+
+# The test run's listing is written in one go at the end
+report = []
  
 def relink(path):
-    old_target = os.path.realpath(path)
-    new_target = old_target.replace(OLDBASE,BASEDIR,1)
+    # Read the link once and work on the string. realpath() would look up
+    # every component of the (moved, so usually missing) target.
+    link = os.readlink(path)
+    linkdir = os.path.dirname(path)
+    old_target = os.path.normpath(os.path.join(linkdir,link))
+    if old_target != OLDBASE and not old_target.startswith(OLDBASE + os.sep):
+        return
+    new_target = BASEDIR + old_target[len(OLDBASE):]
+    if not os.path.isabs(link):
+        new_target = os.path.relpath(new_target,linkdir)
     if DEBUG:
-        print "Relink: " + path + "\n\tfrom " + old_target + "\n\tto " + new_target
+        report.append("Relink: " + path + "\n\tfrom " + old_target + "\n\tto " + new_target + "\n")
     else:
         os.remove(path)
         os.symlink(new_target,path)
  
-for root, dirs, files in os.walk(BASEDIR):
-    for filename in files:
-        fullpath = os.path.join(root,filename)
-        if os.path.islink(fullpath):
-            relink(fullpath)
-    for dirname in dirs:
-        fullpath = os.path.join(root,dirname)
-        if os.path.islink(fullpath):
-            relink(fullpath)
\ No newline at end of file
+def find_symlinks(path):
+    if scandir is None:
+        for root, dirs, files in os.walk(path):
+            for name in files + dirs:
+                fullpath = os.path.join(root,name)
+                if os.path.islink(fullpath):
+                    yield fullpath
+        return
+    # Same order of folders as os.walk, but without an lstat() per entry
+    pending = [path]
+    while pending:
+        subdirs = []
+        try:
+            entries = scandir(pending.pop())
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_symlink():
+                yield entry.path
+            elif entry.is_dir():
+                subdirs.append(entry.path)
+        pending.extend(reversed(subdirs))
+ 
+for fullpath in find_symlinks(BASEDIR):
+    relink(fullpath)
+sys.stdout.write("".join(report))
\ No newline at end of file
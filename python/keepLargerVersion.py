@@ -15,21 +15,55 @@ V0.1 Initial Release
 
 """
 import os
+import sys
 import traceback
 import time
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+from parallel_walk import parallel_walk
 
 __author__ = 'alex'
 
 
 # FUNCTIONS -----------------------------------------------
 
-def list_duplicates(seq):
-    seen = set()
-    seen_add = seen.add
-    # adds all elements it doesn't know yet to seen and all other to seen_twice
-    seen_twice = set(x for x in seq if x in seen or seen_add(x))
-    # turn the set into a list (as requested)
-    return list(seen_twice)
+def strip_extension(name):
+    # Same as os.path.splitext(name)[0] for a bare file name, without its
+    # extra function calls per file
+    stem = name.rpartition('.')[0]
+    # Leading dots don't start an extension (".bashrc" has none)
+    if not stem.strip('.'):
+        return name
+    return stem
+
+
+def remove_smaller_duplicates(paths):
+    """Removes all but the largest file (of equally large ones the oldest).
+    Returns the removed paths and (path, error) pairs for the failed ones."""
+    removed = []
+    failed = []
+    # One stat per file gives both the size and the creation time. Sorted,
+    # as the walk returns folders in no fixed order and max() keeps the
+    # first of complete ties.
+    stats = []
+    for path in sorted(paths):
+        try:
+            stats.append((path, os.stat(path)))
+        except OSError as err:
+            # Without every size the keeper can't be picked, leave them all
+            failed.append((path, err))
+            return removed, failed
+    keep = max(stats, key=lambda item: (item[1].st_size, -item[1].st_ctime))
+    for path, filestat in stats:
+        if path != keep[0]:
+            # Caught per file, so files already removed are still reported
+            try:
+                os.remove(path)
+            except OSError as err:
+                failed.append((path, err))
+            else:
+                removed.append(path)
+    return removed, failed
 
 # END FUNCTIONS -----------------------------------------------
 
@@ -37,56 +71,43 @@ def list_duplicates(seq):
 def main():
     count = 0
     searchpath = "/Volumes/StreamingMedia/Media-Archiv/Film - TV/Serien/WatchOnce"
-    filenames = []
-    filepath = []
+    # name without extension -> paths in walk order, filled in a single pass
+    filepaths = {}
 
     print "\nCaching items…"
-    for root, dirs, files in os.walk(searchpath):
+    # Folders are listed in parallel, mostly waiting on the (network) storage
+    for root, dirs, files in parallel_walk(searchpath):
         for name in files:
-            filenames.append(os.path.splitext(name)[0])
-            filepath.append(os.path.join(root, name))
+            filepaths.setdefault(strip_extension(name), []).append(os.path.join(root, name))
             count += 1
 
-    dupes = list_duplicates(filenames)
-    reversefiles = list(reversed(filenames))
-    size = len(filenames)
-    print "Found " + str(size) + " items."
+    dupes = [name for name, paths in filepaths.iteritems() if len(paths) > 1]
+    print "Found " + str(count) + " items."
 
     if len(dupes) > 0:
         print "\nDuplicates found: \n", "\n".join(dupes), "\n"
-        for dupe in dupes:
-
-            index1 = filenames.index(dupe)
-            index2 = size - reversefiles.index(dupe) - 1
-            file1 = filepath[index1]
-            file2 = filepath[index2]
-            file1size = os.path.getsize(file1)
-            file2size = os.path.getsize(file2)
-
-            if file1size > file2size:
-                print "Removing " + file2
-                os.remove(file2)
-            elif file2size > file1size:
-                print "Removing " + file1
-                os.remove(file1)
-            elif file1size == file2size:
-                file1create = os.path.getctime(file1)
-                file2create = os.path.getctime(file2)
-                if file1create < file2create:
-                    print "Removing " + file2
-                    os.remove(file2)
-                else:
-                    print "Removing " + file1
-                    os.remove(file1)
-
-        filenames = []
-        for root, dirs, files in os.walk(searchpath):
-            for name in files:
-                filenames.append(os.path.splitext(name)[0])
-                count += 1
-
-        size = len(filenames)
-        print "Found " + str(size) + " items after the cleanup."
+        removals = []
+        failures = []
+        # The groups are independent, so their stat() and remove() calls
+        # are spread over a few threads
+        pool = ThreadPool(cpu_count() * 2)
+        try:
+            groups = [filepaths[dupe] for dupe in dupes]
+            for removed, failed in pool.imap_unordered(remove_smaller_duplicates, groups):
+                removals.extend("Removing " + path + "\n" for path in removed)
+                failures.extend("Failed on " + path + ": " + str(err) + "\n"
+                                for path, err in failed)
+        finally:
+            # No new groups are started when interrupted
+            pool.terminate()
+            pool.join()
+            # Listed in one write, including everything removed before an
+            # interruption
+            sys.stdout.write("".join(removals))
+            sys.stderr.write("".join(failures))
+
+        # Every removal is counted, no need to walk again
+        print "Found " + str(count - len(removals)) + " items after the cleanup."
 
     else:
         print "\nNo Duplicates found."
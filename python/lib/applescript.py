@@ -133,7 +133,17 @@ by Ben Waldie at MacTech is a great place to start and may well be where you fin
 
 """
 
+import atexit
+import hashlib
+import os
+import shutil
 import subprocess
+import tempfile
+
+# Compiled .scpt paths, keyed by the SHA-1 of their source.
+_compiled = {}
+# Private (0700) directory the scripts are compiled into, made on first use.
+_compile_dir = None
 
 
 def asrun(ascript):
@@ -150,3 +160,55 @@ def asquote(astr):
 
     astr = astr.replace('"', '" & quote & "')
     return '"{}"'.format(astr)
+
+
+def _private_dir():
+    "Return the directory to compile into, (re)creating it if it is gone."
+
+    global _compile_dir
+    # The system's temp cleaner may have removed it in a long running process
+    if _compile_dir is None or not os.path.isdir(_compile_dir):
+        # Only readable and writable by us, so nobody else can plant or swap
+        # the scripts that get run
+        _compile_dir = tempfile.mkdtemp(prefix='asrun_')
+        atexit.register(shutil.rmtree, _compile_dir, True)
+    return _compile_dir
+
+
+def ascompile(ascript):
+    "Compile the given AppleScript to a .scpt file once and return its path."
+
+    if not isinstance(ascript, bytes):
+        ascript = ascript.encode('utf-8')
+    key = hashlib.sha1(ascript).hexdigest()
+    scpt = _compiled.get(key)
+    if scpt is None or not os.path.exists(scpt):
+        directory = _private_dir()
+        scpt = os.path.join(directory, key + '.scpt')
+        source = os.path.join(directory, key + '.applescript')
+        # Compiled under another name and renamed into place, so an
+        # interrupted osacompile never leaves a partial scpt behind
+        partial = os.path.join(directory, key + '.partial.scpt')
+        with open(source, 'wb') as f:
+            f.write(ascript)
+        try:
+            subprocess.check_call(['osacompile', '-o', partial, source])
+            os.rename(partial, scpt)
+        finally:
+            os.remove(source)
+            if os.path.exists(partial):
+                os.remove(partial)
+        _compiled[key] = scpt
+    return scpt
+
+
+def ascall(ascript, *args):
+    """Run the given AppleScript's run handler with args and return the standard output.
+
+    The script is compiled only once, so it is much cheaper than asrun for scripts
+    called over and over with varying arguments. Pick them up with "on run argv".
+    """
+
+    osa = subprocess.Popen(['osascript', ascompile(ascript)] + list(args),
+                           stdout=subprocess.PIPE)
+    return osa.communicate()[0]
@@ -9,39 +9,86 @@ Copyright (c) 2013 BabylonDreams. All rights reserved.
 
 import os, shutil
 
-def copyFile(src, dst, buffer_size=10485760, perserveFileDate=True):
+
+def _same_file(src, dst, src_st, dst_st):
+    #    Python 2's os.stat on Windows leaves st_dev and st_ino at 0, so the
+    #    stat results can't tell files apart there
+    if os.name != 'nt' and src_st.st_ino != 0:
+        return (src_st.st_dev, src_st.st_ino) == (dst_st.st_dev, dst_st.st_ino)
+    #    Same fallback as shutil._samefile
+    if hasattr(os.path, 'samefile'):
+        try:
+            return os.path.samefile(src, dst)
+        except OSError:
+            return False
+    return (os.path.normcase(os.path.abspath(src)) ==
+            os.path.normcase(os.path.abspath(dst)))
+
+
+def _copy_loop_fast(fsrc, fdst, buffer_size):
+    read = fsrc.read
+    write = fdst.write
+    while True:
+        chunk = read(buffer_size)
+        if not chunk:
+            break
+        write(chunk)
+
+
+def _copy_loop_progress(fsrc, fdst, buffer_size, progress_callback, total):
+    read = fsrc.read
+    write = fdst.write
+    copied = 0
+    while True:
+        chunk = read(buffer_size)
+        if not chunk:
+            break
+        write(chunk)
+        copied += len(chunk)
+        progress_callback(copied, total)
+
+
+def copyFile(src, dst, buffer_size=10485760, perserveFileDate=True, progress_callback=None):
     '''
     Copies a file to a new location. Much faster performance than Apache Commons due to use of larger buffer
     @param src:    Source File
     @param dst:    Destination File (not file path)
     @param buffer_size:    Buffer size to use during copy
     @param perserveFileDate:    Preserve the original file date
+    @param progress_callback:    Optional callable, called with (bytes copied, total bytes) after every buffer
     '''
     #    Check to make sure destination directory exists. If it doesn't create the directory
     dstParent, dstFileName = os.path.split(dst)
     if(not(os.path.exists(dstParent))):
         os.makedirs(dstParent)
     
+    #    Stat both files once and reuse the results for all checks below
+    src_st = os.stat(src)
+    try:
+        dst_st = os.stat(dst)
+    except OSError:
+        # File most likely does not exist
+        dst_st = None
+
     #    Optimize the buffer for small files
-    buffer_size = min(buffer_size,os.path.getsize(src))
+    total = src_st.st_size
+    buffer_size = min(buffer_size, total)
     if(buffer_size == 0):
         buffer_size = 1024
     
-    if shutil._samefile(src, dst):
+    if dst_st is not None and _same_file(src, dst, src_st, dst_st):
         raise shutil.Error("`%s` and `%s` are the same file" % (src, dst))
-    for fn in [src, dst]:
-        try:
-            st = os.stat(fn)
-        except OSError:
-            # File most likely does not exist
-            pass
-        else:
-            # XXX What about other special files? (sockets, devices...)
-            if shutil.stat.S_ISFIFO(st.st_mode):
-                raise shutil.SpecialFileError("`%s` is a named pipe" % fn)
+    for fn, st in [(src, src_st), (dst, dst_st)]:
+        # XXX What about other special files? (sockets, devices...)
+        if st is not None and shutil.stat.S_ISFIFO(st.st_mode):
+            raise shutil.SpecialFileError("`%s` is a named pipe" % fn)
     with open(src, 'rb') as fsrc:
         with open(dst, 'wb') as fdst:
-            shutil.copyfileobj(fsrc, fdst, buffer_size)
+            #    Pick the loop once so the common no-callback case never checks for it
+            if progress_callback is None:
+                _copy_loop_fast(fsrc, fdst, buffer_size)
+            else:
+                _copy_loop_progress(fsrc, fdst, buffer_size, progress_callback, total)
     
     if(perserveFileDate):
         shutil.copystat(src, dst)
\ No newline at end of file
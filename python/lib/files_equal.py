@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+import io, os
+from hash_for_file import fadvise
+
+
+def _readinto(f, view):
+    # Raw reads may come back short before the end of the file, so keep going
+    count = 0
+    while count < len(view):
+        read = f.readinto(view[count:])
+        if not read:
+            break
+        count += read
+    return count
+
+
+def _advise(files, advice):
+    if fadvise is not None:
+        for f in files:
+            fadvise(f.fileno(), 0, 0, getattr(os, advice))
+
+
+def _compare_blocks(fleft, fright, block_size, hashes):
+    leftbuffer = bytearray(block_size)
+    rightbuffer = bytearray(block_size)
+    leftview = memoryview(leftbuffer)
+    rightview = memoryview(rightbuffer)
+    while True:
+        leftcount = _readinto(fleft, leftview)
+        rightcount = _readinto(fright, rightview)
+        if leftcount != rightcount:
+            return False
+        if leftcount < block_size:
+            leftbuffer = leftbuffer[:leftcount]
+            rightbuffer = rightbuffer[:rightcount]
+        if leftbuffer != rightbuffer:
+            return False
+        if hashes is not None:
+            # Both blocks are the same, so both hashes get the left one
+            for hashvalue in hashes:
+                hashvalue.update(leftbuffer)
+        if leftcount < block_size:
+            return True
+
+
+def files_equal(leftName, rightName, block_size=1048576, hashes=None):
+    '''
+    Compares two files block by block. Stops at the first differing block and
+    doesn't read anything at all if the sizes already differ.
+
+    hashes can be a (left, right) pair of hash objects that get every block
+    compared, they hold the files' digests if the files turn out equal.
+    '''
+    with io.open(leftName, "rb", buffering=0) as fleft:
+        with io.open(rightName, "rb", buffering=0) as fright:
+            if os.fstat(fleft.fileno()).st_size != os.fstat(fright.fileno()).st_size:
+                return False
+
+            _advise((fleft, fright), 'POSIX_FADV_SEQUENTIAL')
+            try:
+                return _compare_blocks(fleft, fright, block_size, hashes)
+            finally:
+                _advise((fleft, fright), 'POSIX_FADV_DONTNEED')
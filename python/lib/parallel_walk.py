@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+parallel_walk.py
+
+Like os.walk, but several directories are listed at the same time. On
+network shares most of a walk is spent waiting for each listing, so this
+scales with the number of workers. Directories are yielded in whatever
+order their listings finish.
+"""
+
+import os, threading
+from multiprocessing import cpu_count
+from Queue import Queue, Empty
+
+try:
+    # DirEntry.is_dir() comes from the listing itself (https://github.com/benhoyt/scandir)
+    from scandir import scandir
+except ImportError:
+    scandir = None
+
+
+def _list_dir(path):
+    dirs = []
+    files = []
+    recurse = []
+    if scandir is not None:
+        for entry in scandir(path):
+            if entry.is_dir():
+                dirs.append(entry.name)
+                if not entry.is_symlink():
+                    recurse.append(entry.path)
+            else:
+                files.append(entry.name)
+    else:
+        prefix = os.path.join(path, "")
+        for name in os.listdir(path):
+            fullname = prefix + name
+            if os.path.isdir(fullname):
+                dirs.append(name)
+                if not os.path.islink(fullname):
+                    recurse.append(fullname)
+            else:
+                files.append(name)
+    return dirs, files, recurse
+
+
+def parallel_walk(top, workers=None):
+    """Yields (root, dirs, files) for every directory below top, like os.walk
+    with its defaults (unreadable directories are skipped, symlinked
+    directories are listed but not followed)."""
+    if workers is None:
+        workers = min(32, cpu_count() * 4)
+    pending = Queue()
+    results = Queue()
+
+    def worker():
+        while True:
+            path = pending.get()
+            if path is None:
+                return
+            try:
+                dirs, files, recurse = _list_dir(path)
+            except OSError:
+                pass
+            else:
+                # Queue the subfolders before this one counts as done, so the
+                # walk can't look finished while there is still work left
+                for subdir in recurse:
+                    pending.put(subdir)
+                results.put((path, dirs, files))
+            finally:
+                pending.task_done()
+
+    def finish():
+        pending.join()
+        # Let the workers end instead of leaving them waiting on the queue
+        for i in xrange(workers):
+            pending.put(None)
+        results.put(None)
+
+    threads = [threading.Thread(target=worker) for i in xrange(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    pending.put(top)
+    finisher = threading.Thread(target=finish)
+    finisher.daemon = True
+    finisher.start()
+
+    while True:
+        try:
+            # A blocking get() without timeout can't be interrupted with ctrl-c
+            item = results.get(True, 3600)
+        except Empty:
+            continue
+        if item is None:
+            # Python 2 can trip over daemon threads still running at exit
+            for thread in threads + [finisher]:
+                thread.join()
+            return
+        yield item
@@ -49,19 +49,17 @@ def main(argv=None):
 			if os.path.isdir(path):
 				# remove empty subfolders
 				for root, dirs, files in os.walk(path):
+					# os.walk has already listed this folder, so an empty one
+					# needs no extra listdir() from its parent
+					if root != path and len(dirs) == 0 and len(files) == 0:
+						keepme = root + "/keepme.md"
+						file = open(keepme, 'w')
+						file.write('This is a placeholder file to keep this file\'s parent folder trackable with Git for further reference, since it doesn\'t make sense to track, for example, whole software packages that are easily redownloadable again.')
+						file.close()
+						print "Created " + keepme
+						empty += 1
 					if '.git' in dirs:
 					        dirs.remove('.git')
-					for name in dirs:
-						names = os.path.join(root, name)
-						# if folder empty, mark it
-						files = os.listdir(names)
-						if len(files) == 0:
-							keepme = names + "/keepme.md"
-							file = open(keepme, 'w')
-							file.write('This is a placeholder file to keep this file\'s parent folder trackable with Git for further reference, since it doesn\'t make sense to track, for example, whole software packages that are easily redownloadable again.')
-							file.close()
-							print "Created " + keepme
-							empty += 1
 				if empty == 0:
 					print "No empty directories in this tree."
 		except:
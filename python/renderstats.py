@@ -14,10 +14,12 @@ V0.1 Initial Release - 2017-10-04
 """
 
 import argparse
+import operator
 import re
+import stat
 import sys
 import traceback
-from itertools import imap
+from itertools import groupby, imap
 
 SEQ_REGEX = re.compile('^(?P<basename>.*[_\.])(?P<frame>\d+)(?P<extension>\..*)$')
 
@@ -42,19 +44,33 @@ def secondsToHoursMinutesSeconds(seconds):
     return secondsToString
 
 
-def get_stats(path, filename, files):
-    m_stat = []
-    r_time = []
-    counter = 0
+def stat_files(path, filename, files):
+    """
+    Yields (name, stat result) for every regular file in files except filename.
+    Every file is stat'ed exactly once, the results serve all later checks.
+    """
     for i in files:
-        if os.path.isfile(os.path.join(path, i)) and i != filename:
-            counter += 1
-            m_stat.append(os.stat(os.path.join(path, i)).st_mtime)
+        if i == filename:
+            continue
+        try:
+            st = os.stat(os.path.join(path, i))
+        except OSError:
+            continue
+        if stat.S_ISREG(st.st_mode):
+            yield i, st
+
 
-            if len(m_stat) > 2:
-                r_time.append(abs(m_stat[-1] - m_stat[-2]))
+def get_stats(path, file_stats):
+    m_stat = [st.st_mtime for i, st in file_stats]
+    counter = len(m_stat)
 
-    rendertime = max(m_stat) - min(m_stat) + ((max(m_stat) - min(m_stat)) / counter)
+    # Sorted mtimes give the span from the ends and the per frame times as
+    # neighbour gaps, all computed by C-level builtins
+    m_stat.sort()
+    r_time = map(operator.sub, m_stat[1:], m_stat[:-1])
+    span = m_stat[-1] - m_stat[0]
+
+    rendertime = span + (span / counter)
 
     stats = 'Listing render stats for "{}":\n' \
             '\nOverall rendertime: {} for {} files\n' \
@@ -71,96 +87,87 @@ def get_stats(path, filename, files):
 
     return stats
 
-def check_size(path, files):
-    for i in files:
-        if os.path.isfile(os.path.join(path, i)) and os.path.getsize(os.path.join(path, i)) < 128:
+def check_size(file_stats):
+    for i, st in file_stats:
+        if st.st_size < 128:
             yield i
 
 
-def check_files(path, files):
+def check_files(path, files, file_stats):
     seq_files = get_sequential_files(files)
-    message = ""
-    message += "\nFound the following continuous frame ranges:"
+    message = ["\nFound the following continuous frame ranges:"]
 
     message = string_range(seq_files, message)
 
-    missing_frames = sorted(list(missing(min(seq_files), max(seq_files), seq_files)))
+    first = min(seq_files)
+    last = max(seq_files)
+    missing_frames = missing(first, last, seq_files)
     if len(missing_frames) > 0:
 
-        message += "\n\nExpected a continuous range from {} to {}. Missing {} frames:".format(
-            min(seq_files),
-            max(seq_files),
+        message.append("\n\nExpected a continuous range from {} to {}. Missing {} frames:".format(
+            first,
+            last,
             len(missing_frames)
-        )
+        ))
 
         message = string_range(missing_frames, message)
 
     else:
-        message += "\nAll frames accounted for."
+        message.append("\nAll frames accounted for.")
 
-    if len(list(check_size(path, files))) > 0:
-        message += "\n\nSome files ({}) are smaller then 128 bytes and are likely broken or incomplete:".format(
-            len(list(check_size(path, files))))
-        message = string_range(get_sequential_files(check_size(path, files)), message)
+    small_files = list(check_size(file_stats))
+    if len(small_files) > 0:
+        message.append("\n\nSome files ({}) are smaller then 128 bytes and are likely broken or incomplete:".format(
+            len(small_files)))
+        message = string_range(get_sequential_files(small_files), message)
 
-    return message
+    return "".join(message)
 
 
-def missing(first, last, list, incr=1):
+def missing(first, last, frames, incr=1):
     """
-    Returns the set of frames missing for this instance as the difference
-    between the set of all frames from self.first to self.last (inclusive)
-    with the increment provided.
+    Returns the frames missing for this instance as the difference
+    between all frames from self.first to self.last (inclusive)
+    with the increment provided and the given frames.
 
     :key incr: the increment value to use (1) for the full set of frames.
     :type incr: int
-    :returns: set of all missing frames.
-    :rtype: set
+    :returns: sorted list of all missing frames.
+    :rtype: list
     """
+    if not isinstance(frames, (set, frozenset)):
+        frames = set(frames)
 
-    return set(xrange(first, last + 1, incr)).difference(list)
+    return [i for i in xrange(first, last + 1, incr) if i not in frames]
 
 
 def contractor(ranges):
     """
     Yields the current SequentialRange contents as a list of tuples.
-    Each tuple represents (first, last, increment) of a continuous frame
+    Each tuple represents (first, last) of a continuous frame
     range.  The purpose of contractor is to provide a quick means of
     seeing all the continuous and discontinuous ranges in the
     SequentialRange object via a Generator object.
 
-    :yields: each (first, last, incr) tuple.
+    :yields: each (first, last) tuple.
     :ytype: tuple
     """
-    frames = sorted(list(ranges))
-    total = len(frames)
-    curr_idx = 0
-    while curr_idx < total:
-        first, last, incr = frames[curr_idx], frames[curr_idx], 1
-        if curr_idx + 2 < total:
-            last_idx = curr_idx + 2
-            curr_incr = frames[curr_idx + 1] - frames[curr_idx]
-            while last_idx < total:
-                if curr_incr == frames[last_idx] - frames[last_idx - 1]:
-                    last = frames[last_idx]
-                    incr = curr_incr
-                    curr_idx = last_idx
-                else:
-                    break
-
-                last_idx += 1
-
-        curr_idx += 1
+    # Within a continuous range frame - index stays constant
+    for key, group in groupby(enumerate(sorted(ranges)), lambda pair: pair[1] - pair[0]):
+        first = last = next(group)[1]
+        for index, last in group:
+            pass
         yield first, last
 
 
 def string_range(frame_range, message):
 
+    append = message.append
     for frames in contractor(frame_range):
         if frames[0] == frames[1]:
-            message += "\n{}".format(frames[0])
+            append("\n{}".format(frames[0]))
         else:
-            message += "\n{}-{}".format(frames[0], frames[1])
+            append("\n{}-{}".format(frames[0], frames[1]))
 
     return message
 
@@ -176,27 +183,20 @@ def get_sequential_files(filenames):
     results = {}
     for match in imap(SEQ_REGEX.match, filenames):
         if match:
-            key = '%(pad)s'.join([match.group('basename'), \
-                                  match.group('extension')])
+            basename, frame, extension = match.group('basename', 'frame', 'extension')
+            key = '%(pad)s'.join([basename, extension])
 
-            if key not in results.keys():
-                results[key] = set()
+            frames = results.get(key)
+            if frames is None:
+                frames = results[key] = set()
             # end if
 
-            results[key].add(match.group('frame'))
+            frames.add(int(frame))
             # end if
     # end for loop
 
-    for name in sorted(results.keys()):
-        frames = set(imap(int, results[name]))
-        lengths = list(sorted(set(imap(len, results[name]))))
-
-        if len(lengths) == 1:
-            length = lengths[0]
-        else:
-            length = min(lengths)
-
-        return frames
+    if results:
+        return results[min(results)]
 
 
 # END FUNCTIONS -----------------------------------------------
@@ -215,11 +215,12 @@ def main(infile, fileout, recursive, filename):
 
     if recursive:
         for path, dirs, files in os.walk(path):
-            get_stats(path, filename, files)
+            get_stats(path, list(stat_files(path, filename, files)))
     else:
         files = os.listdir(path)
-        stats = get_stats(path, filename, files)
-        filecheck = check_files(path, files)
+        file_stats = list(stat_files(path, filename, files))
+        stats = get_stats(path, file_stats)
+        filecheck = check_files(path, files, file_stats)
 
         if fileout:
             outfile = os.path.join(path, filename)
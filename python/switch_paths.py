@@ -14,7 +14,9 @@ V0.1 Initial Release - ${YEAR}-${MONTH}-${DAY}
 """
 
 import argparse
+import re
 import traceback
+from collections import Counter
 
 
 # FUNCTIONS -----------------------------------------------
@@ -33,27 +35,34 @@ def main(infile):
              "/Volumes/ProjectsRaid/x_Pipeline/x_AppPlugins/modo/content/Kits/vizpak_products_vray_octane-1.0.0/VizPak_Products/Images/Metal/",
              "/Volumes/ProjectsRaid/x_Pipeline/x_AppPlugins/modo/content/Kits/vizpak_products_vray_octane-1.0.0/VizPak_Products/Images/Wood/"]
 
-    with open(infile) as readfile:
-        file_str = readfile.read()
+    # One alternation finds all paths in a single pass over the file
+    pathRegEx = re.compile("|".join(re.escape(path) for path in paths))
+    replaced = Counter()
 
-    outstr = []
-
-    for line in file_str.splitlines(True):
-
-        for path in paths:
-            if path in line:
-                replace = line.replace(path, newpath)
-                print("{} → {}".format(line, replace))
-                line = replace
-
-        outstr.append(line)
-
-    file_str = ''.join(outstr)
+    def replace(match):
+        replaced[match.group()] += 1
+        return newpath
 
     outfile = os.path.splitext(infile)[0] + "_volker" + os.path.splitext(infile)[1]
 
-    with open(outfile, "w") as f:
-            f.write(file_str)
+    # Stream the file in chunks so huge scenes never sit in memory as a whole
+    chunk_size = 8 * 1024 * 1024
+    with open(infile, "rb") as readfile, open(outfile, "wb", chunk_size) as f:
+        tail = ""
+        while True:
+            chunk = readfile.read(chunk_size)
+            if not chunk:
+                break
+            chunk = tail + chunk
+            # Paths never span lines, so everything up to the last newline is safe
+            cut = chunk.rfind("\n") + 1
+            f.write(pathRegEx.sub(replace, chunk[:cut]))
+            tail = chunk[cut:]
+        f.write(pathRegEx.sub(replace, tail))
+
+    for path in paths:
+        if replaced[path]:
+            print("{} → {} ({} times)".format(path, newpath, replaced[path]))
 
 
 
@@ -32,10 +32,50 @@ Copyright 2017 - BabylonDreams - Alexander Kucera & Monika Kucera GbR
 # END FUNCTIONS -----------------------------------------------
 
 # MAIN PROGRAM --------------------------------------------
-import timeit
+try:
+    # Monotonic and high resolution on every platform (Python 3.3+)
+    from time import perf_counter as default_timer
+except ImportError:
+    # The same clock timeit.default_timer picks on Python 2, without
+    # importing all of timeit for it
+    import sys, time
+    if sys.platform == "win32":
+        default_timer = time.clock
+    else:
+        default_timer = time.time
+
+try:
+    # Integer nanoseconds, no float rounding on long runs (Python 3.7+)
+    from time import perf_counter_ns as timer_ns
+except ImportError:
+    def timer_ns():
+        return int(default_timer() * 1000000000)
+
+
+# Set to False to measure without printing, e.g. timer.VERBOSE = False
+VERBOSE = True
+
+
+def print_running_time(nanoseconds, name=''):
+    if VERBOSE:
+        if name:
+            name += ' '
+        print('{0}Running Time: {1}'.format(name, nanosecondsToHoursMinutesSeconds(nanoseconds)))
+
+
+def timer_start():
+    """ returns a start value (in nanoseconds) for timer_stop"""
+    return timer_ns()
 
 
-def timer(elapsed=0.0, name=''):
+def timer_stop(start, name=''):
+    """ returns the seconds since timer_start, printed only when VERBOSE is set"""
+    nanoseconds = timer_ns() - start
+    print_running_time(nanoseconds, name)
+    return nanoseconds * 1e-9
+
+
+def timer(elapsed=0, name=''):
     """
     Timer function for debugging.
 
@@ -45,33 +85,70 @@ def timer(elapsed=0.0, name=''):
 
         bd_helpers.timer(start, "test")
 
+    The returned start value is in nanoseconds.
+
     """
-    running_timer = timeit.default_timer()
-    if elapsed != 0.0:
-        running_time = running_timer - elapsed
-        timestring = secondsToHoursMinutesSeconds(running_time)
-        if name is not '':
-            name += ' '
-        print('{0}Running Time: {1}'.format(name, timestring))
+    running_timer = timer_ns()
+    if elapsed:
+        print_running_time(running_timer - elapsed, name)
     return running_timer
 
 
-def secondsToHoursMinutesSeconds(seconds):
-    """ takes a seconds int or float and returns a string that breaks"""
-    minutes, seconds = divmod(seconds, 60)
-    hours, minutes = divmod(minutes, 60)
-    if hours != 0:
-        hours = "{} hours ".format(int(hours))
-    else:
-        hours = ""
-    if minutes != 0:
-        minutes = "{} minutes ".format(int(minutes))
-    else:
-        minutes = ""
-    seconds = "{:.2f} seconds".format(seconds)
+class Timer(object):
+    """
+    Context manager version of timer(), one call per timed block.
 
-    secondsToString = '{hours}{minutes}{seconds}'.format(hours=hours, minutes=minutes, seconds=seconds)
+    Example:
+
+        with Timer("test"):
+            do_something()
+
+    """
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name=''):
+        self.name = name
+
+    def __enter__(self):
+        self.start = timer_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        print_running_time(timer_ns() - self.start, self.name)
+
+
+# "H hours M minutes " per (hours, minutes), timings of similar length keep
+# hitting the same few entries
+_hours_minutes_strings = {}
 
-    return secondsToString
+
+def _hours_minutes_string(hours, minutes):
+    try:
+        return _hours_minutes_strings[hours, minutes]
+    except KeyError:
+        string = '{0}{1}'.format('{0} hours '.format(hours) if hours else '',
+                                 '{0} minutes '.format(minutes) if minutes else '')
+        _hours_minutes_strings[hours, minutes] = string
+        return string
+
+
+NANOSECONDS_PER_MINUTE = 60 * 1000000000
+NANOSECONDS_PER_HOUR = 60 * NANOSECONDS_PER_MINUTE
+
+
+def nanosecondsToHoursMinutesSeconds(nanoseconds):
+    """ like secondsToHoursMinutesSeconds, but for an int of nanoseconds"""
+    # The usual case when timing code, skips all the splitting
+    if nanoseconds < NANOSECONDS_PER_MINUTE:
+        return '{0:.2f} seconds'.format(nanoseconds * 1e-9)
+    # Integer divmods, only the remaining seconds become a float
+    hours, nanoseconds = divmod(nanoseconds, NANOSECONDS_PER_HOUR)
+    minutes, nanoseconds = divmod(nanoseconds, NANOSECONDS_PER_MINUTE)
+    return _hours_minutes_string(hours, minutes) + '{0:.2f} seconds'.format(nanoseconds * 1e-9)
+
+
+def secondsToHoursMinutesSeconds(seconds):
+    """ takes a seconds int or float and returns a string that breaks"""
+    return nanosecondsToHoursMinutesSeconds(int(round(seconds * 1000000000)))
 
 # END MAIN PROGRAM -----------------------------------------------
\ No newline at end of file